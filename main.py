@@ -1,13 +1,22 @@
 import os
 import json
-import time
 import re
 import random
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-from bs4 import BeautifulSoup
+import subprocess
+import multiprocessing
+import threading
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urldefrag, urljoin
+
+import aiohttp
+from yarl import URL
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree, html as lxml_html
 
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font
 from openpyxl.utils import get_column_letter
 
@@ -40,48 +49,194 @@ OUTPUT_COLUMNS = [
 DOCS_SHEET_NAME = "Documents"
 MAIN_SHEET_NAME = "ALL"
 
+# листинг: из страницы нужны только ссылки на лоты
+LISTING_STRAINER = SoupStrainer("a", href=re.compile("/lot/"))
+
+
+def _has_class(name: str) -> str:
+    """XPath-предикат, аналог CSS .name (класс — одно из слов в @class)"""
+    # дешёвый contains отсекает почти все узлы до склейки concat/normalize-space
+    return f"contains(@class, '{name}') and contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# корневые блоки карточки собираются за один проход по дереву (см. _index_lot_sections),
+# а не отдельным //-запросом на каждый
+_LOT_SECTION_CLASSES = {
+    "lot__help", "lot__status", "lot__content",
+    "lot-info__wrapper", "lot-details-info__item",
+    "lot-documents__wrapper", "lot-documents__link",
+}
+_XP_LOT_SECTIONS = etree.XPath("//*[contains(@class, 'lot')]")
+
+# селекторы внутри блоков — компилируем один раз при импорте
+_XP_INFO_TITLE = etree.XPath(f".//h3[{_has_class('lot-info__title')}]")
+_XP_INFO_ITEMS = etree.XPath(f".//div[{_has_class('lot-info__item')}]")
+_XP_INFO_SUBTITLE = etree.XPath(f".//*[{_has_class('lot-info__subtitle')}]")
+_XP_INFO_VALUE = etree.XPath(f".//*[{_has_class('lot-info__value')}]")
+_XP_DETAILS_SUBTITLE = etree.XPath(f".//*[{_has_class('lot-details-info__subtitle')}]")
+_XP_DETAILS_VALUE = etree.XPath(f".//*[{_has_class('lot-details-info__value')}]")
+_XP_DETAILS_ANY_VALUE = etree.XPath(".//*[self::span or self::div or self::a]")
+_XP_DATA_NUMBER_LINK = etree.XPath(".//a[@data-number]")
+_XP_DESCRIPTION_P = etree.XPath(".//p[@itemprop='description']")
+# HTML-парсер не знает про namespace: xlink:href — просто имя атрибута
+_XP_LOCATION_LINK = etree.XPath(".//a[.//use[contains(@*[name()='xlink:href'], 'icon-location')]][1]")
+_XP_TEXT = etree.XPath(".//text()", smart_strings=False)
+
+
+def _first(nodes):
+    return nodes[0] if nodes else None
+
+
+def _index_lot_sections(tree) -> dict:
+    """{класс из _LOT_SECTION_CLASSES: [элементы в порядке документа]} — один проход по дереву"""
+    sections = {}
+    for el in _XP_LOT_SECTIONS(tree):
+        for c in el.get("class").split():
+            if c in _LOT_SECTION_CLASSES:
+                sections.setdefault(c, []).append(el)
+    return sections
+
+
+def _section_nodes(sections: dict, name: str, tag: str, also: str = None) -> list:
+    """Элементы <tag class="name [also]"> из _index_lot_sections"""
+    return [
+        el for el in sections.get(name, ())
+        if el.tag == tag and (also is None or also in el.get("class").split())
+    ]
+
+
+_PARSER_LOCAL = threading.local()
+
+
+def _html_parser():
+    """Свой HTMLParser на поток (парсер lxml не потокобезопасен); id->element таблица карточке не нужна"""
+    parser = getattr(_PARSER_LOCAL, "parser", None)
+    if parser is None:
+        parser = _PARSER_LOCAL.parser = lxml_html.HTMLParser(recover=True, collect_ids=False)
+    return parser
+
+
+def _text(el) -> str:
+    """То же, что BeautifulSoup get_text(" ", strip=True)"""
+    return " ".join(t for t in (s.strip() for s in _XP_TEXT(el)) if t)
+
+
+_LOT_RE = re.compile(r"Лот\s*№\s*(\d+)", re.IGNORECASE)
+_TRADE_RE = re.compile(r"торги\s*№\s*(\d+)", re.IGNORECASE)
+# адрес в тексте описания: по приоритету, следующий шаблон — только если предыдущий не нашёл
+# («расположен(а)/находится по адресу:» -> «по адресу:» -> «местонахождение:»)
+_ADDR_TAIL = r"\s*:\s*(.+?)(?=(?:начальн\w*\s+цен|задаток|кадастров\w*\s+номер|$))"
+_ADDR_RES = (
+    re.compile(r"(?i)(?:расположен\w*|наход\w*)\s+по\s+адрес[ау]?" + _ADDR_TAIL),
+    re.compile(r"(?i)по\s+адрес[ау]?" + _ADDR_TAIL),
+    re.compile(r"(?i)местонахождение\s*:\s*(.+?)(?=(?:начальн\w*\s+цен|задаток|$))"),
+)
+
+# что не нужно Chrome для листинга: блокируется через CDP Network.setBlockedURLs
+BROWSER_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg",
+    "*.woff", "*.woff2", "*.ttf",
+    "*.css",
+    "*.mp4",
+    # счётчики и реклама: DOM не меняют, а load задерживают
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*mc.yandex.ru*", "*an.yandex.ru*",
+]
+
+# разметка карточки: если её нет в HTML по HTTP, карточка рендерится JS — её откроет Chrome
+LOT_PAGE_MARKERS = ("lot-info__wrapper", "lot-details-info")
+LOT_PAGE_SELECTOR = ", ".join(f".{c}" for c in LOT_PAGE_MARKERS)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0 Safari/537.36"
+)
+
 
 # ----------------------------
 # Persistent store for "already parsed lots"
 # ----------------------------
 class SeenLotsStore:
-    def __init__(self, path: str = "seen_lots.json"):
+    """
+    Append-only лог: 1 лот на строку, новые лоты только дописываются в конец.
+    Хранится не весь URL, а ключ — часть пути после /lot/ (префикс у всех одинаковый).
+    Старый формат (seen_lots.json со списком URL) подхватывается при первом запуске.
+    """
+
+    def __init__(self, path: str = "seen_lots.log", legacy_json_path: str = "seen_lots.json"):
         self.path = path
+        self.legacy_json_path = legacy_json_path
         self.seen = set()
 
+    @staticmethod
+    def _key(url: str) -> str:
+        return url.strip().split("/lot/", 1)[-1]
+
+    def __contains__(self, url) -> bool:
+        return self._key(url) in self.seen
+
     def load(self):
+        self.seen = set()
         if not os.path.exists(self.path):
-            self.seen = set()
+            self.seen = self._load_legacy_json()
+            if self.seen:
+                self.compact()
             return self.seen
+
+        lines = 0
+        normalized = True
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                u = line.strip()
+                if u:
+                    key = self._key(u)
+                    normalized = normalized and key == u
+                    self.seen.add(key)
+                    lines += 1
+
+        # дубли (например, два запуска одновременно) или полные URL в логе — переписываем
+        if lines != len(self.seen) or not normalized:
+            self.compact()
+        return self.seen
+
+    def _load_legacy_json(self):
+        if not self.legacy_json_path or not os.path.exists(self.legacy_json_path):
+            return set()
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
+            with open(self.legacy_json_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
+            if isinstance(data, dict) and "seen" in data:
+                data = data["seen"]
             if isinstance(data, list):
-                self.seen = set(data)
-            elif isinstance(data, dict) and "seen" in data and isinstance(data["seen"], list):
-                self.seen = set(data["seen"])
-            else:
-                self.seen = set()
+                return {self._key(u) for u in data if isinstance(u, str) and u.strip()}
         except Exception:
-            self.seen = set()
-        return self.seen
-
-    def add_many(self, urls):
-        for u in urls:
-            if u:
-                self.seen.add(u)
-
-    def save(self):
+            pass
+        return set()
+
+    def add_and_flush(self, urls) -> int:
+        """Дописывает в лог только новые лоты, возвращает их количество"""
+        new = [k for k in dict.fromkeys(self._key(u) for u in urls if u) if k not in self.seen]
+        if new:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(u + "\n" for u in new)
+            self.seen.update(new)
+        return len(new)
+
+    def compact(self):
         tmp = self.path + ".tmp"
-        payload = sorted(self.seen)
         with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+            f.writelines(u + "\n" for u in sorted(self.seen))
         os.replace(tmp, self.path)
 
 
 # ----------------------------
 # Cookies auth helper
 # ----------------------------
+def is_logged_in(html: str) -> bool:
+    """Неавторизованному сайт показывает кнопку «Войти»"""
+    return "войти" not in html.lower()
+
+
 def load_auth_cookies(cookies_path: str):
     if not cookies_path or not os.path.exists(cookies_path):
         return []
@@ -101,7 +256,8 @@ def apply_cookies_to_driver(driver, base_url: str, cookies_path: str):
 
     # ОБЯЗАТЕЛЬНО открыть домен
     driver.get(base_url.rstrip("/") + "/")
-    time.sleep(1.2)
+    wait = WebDriverWait(driver, 12)
+    wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
 
     added = 0
     for c in cookies:
@@ -130,10 +286,9 @@ def apply_cookies_to_driver(driver, base_url: str, cookies_path: str):
             print("cookie skip:", cc.get("name"), e)
 
     driver.refresh()
-    time.sleep(1.2)
+    wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
 
-    page = driver.page_source.lower()
-    is_ok = ("войти" not in page)
+    is_ok = is_logged_in(driver.page_source)
     print(f"Cookies applied: {added}, logged_in={is_ok}")
 
     if not is_ok:
@@ -143,44 +298,89 @@ def apply_cookies_to_driver(driver, base_url: str, cookies_path: str):
 
 
 # ----------------------------
-# Excel helpers (ALL + Documents with hyperlinks)
+# Rows ledger (JSONL): 1 строка = 1 распарсенный лот, только дописывается
 # ----------------------------
-def ensure_workbook(filename: str):
-    if os.path.exists(filename):
-        wb = load_workbook(filename)
-    else:
-        wb = Workbook()
+def append_rows_to_ledger(rows: list, ledger_path: str) -> int:
+    """
+    rows: list of dict with OUTPUT_COLUMNS + internal field:
+      - __docs: list[(name,url)]
+    Дописывает в журнал по строке JSON на лот: {"row": {...}, "docs": [[name, url], ...]}
+    """
+    with open(ledger_path, "a", encoding="utf-8") as f:
+        for row in rows:
+            docs = row.pop("__docs", [])
+            rec = {
+                "row": {c: row.get(c, "") for c in OUTPUT_COLUMNS},
+                "docs": [[name, url] for name, url in docs if name and url],
+            }
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return len(rows)
 
-    # MAIN sheet
-    if MAIN_SHEET_NAME in wb.sheetnames:
-        ws_main = wb[MAIN_SHEET_NAME]
-    else:
-        ws_main = wb.active
-        ws_main.title = MAIN_SHEET_NAME
-        ws_main.append(OUTPUT_COLUMNS)
 
-    # DOCS sheet
-    if DOCS_SHEET_NAME in wb.sheetnames:
-        ws_docs = wb[DOCS_SHEET_NAME]
-    else:
-        ws_docs = wb.create_sheet(DOCS_SHEET_NAME)
-        ws_docs.append(["Номер аукциона / лота", "Документы"])
+def read_ledger(ledger_path: str):
+    if not os.path.exists(ledger_path):
+        return
+    with open(ledger_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # недописанная строка (скрипт прервали посреди записи)
+                continue
 
-    header_font = Font(bold=True)
-    for cell in ws_main[1]:
-        cell.font = header_font
-        cell.alignment = Alignment(vertical="center")
-    for cell in ws_docs[1]:
-        cell.font = header_font
-        cell.alignment = Alignment(vertical="center")
 
-    ws_main.freeze_panes = "A2"
-    ws_docs.freeze_panes = "A2"
+def seed_ledger_from_workbook(filename: str, ledger_path: str) -> int:
+    """
+    Разовый перенос: xlsx, созданный до появления журнала -> журнал.
+    Документы берутся с листа Documents (текст + гиперссылка).
+    """
+    if os.path.exists(ledger_path) or not os.path.exists(filename):
+        return 0
 
-    return wb, ws_main, ws_docs
+    wb = load_workbook(filename)
+    if MAIN_SHEET_NAME not in wb.sheetnames:
+        return 0
+
+    docs_by_key = {}
+    if DOCS_SHEET_NAME in wb.sheetnames:
+        for cells in wb[DOCS_SHEET_NAME].iter_rows(min_row=2):
+            key = cells[0].value
+            if not key:
+                continue
+            docs_by_key.setdefault(str(key).strip(), [
+                [c.value, c.hyperlink.target] for c in cells[1:]
+                if c.value and c.hyperlink and c.hyperlink.target
+            ])
+
+    rows_iter = wb[MAIN_SHEET_NAME].iter_rows(values_only=True)
+    headers = next(rows_iter, ())
+
+    tmp = ledger_path + ".tmp"
+    count = 0
+    with open(tmp, "w", encoding="utf-8") as f:
+        for values in rows_iter:
+            if not any(v is not None for v in values):
+                continue
+            old = dict(zip(headers, values))
+            row = {c: ("" if old.get(c) is None else old.get(c)) for c in OUTPUT_COLUMNS}
+            row["Документы"] = ""
+            lot_key = str(row["Номер аукциона / лота"]).strip()
+            rec = {"row": row, "docs": docs_by_key.get(lot_key, [])}
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            count += 1
+    os.replace(tmp, ledger_path)
 
+    print(f"Журнал {ledger_path} создан из {filename}: {count} строк")
+    return count
 
-def set_column_widths(ws):
+
+# ----------------------------
+# Excel export (write-only: ALL + Documents with hyperlinks)
+# ----------------------------
+def set_column_widths(ws, headers):
     col_widths = {
         "Номер аукциона / лота": 25,
         "Адрес объекта": 65,
@@ -194,246 +394,196 @@ def set_column_widths(ws):
         "Описание объекта": 100,
     }
 
-    headers = [ws.cell(row=1, column=c).value for c in range(1, ws.max_column + 1)]
     for idx, name in enumerate(headers, start=1):
         if name in col_widths:
             ws.column_dimensions[get_column_letter(idx)].width = col_widths[name]
 
 
-def read_existing_lot_keys(ws_docs) -> set:
-    """Чтобы не дублировать строки лота на Documents при повторном запуске"""
-    keys = set()
-    for r in range(2, ws_docs.max_row + 1):
-        v = ws_docs.cell(row=r, column=1).value
-        if v:
-            keys.add(str(v).strip())
-    return keys
-
-
-def append_documents_row_wide(ws_docs, lot_key: str, docs: list) -> int:
-    """
-    Добавляет 1 строку:
-      A = lot_key
-      B.. = документы (кликабельные гиперссылки)
-    Возвращает номер строки, куда записали.
-    """
-    r = ws_docs.max_row + 1
-    ws_docs.cell(row=r, column=1).value = lot_key
-
-    col = 2
-    for name, url in docs:
-        if not name or not url:
-            continue
-
-        cell = ws_docs.cell(row=r, column=col)
-        cell.value = name
-        cell.hyperlink = url
-        cell.style = "Hyperlink"
-        col += 1
+def _header_cells(ws, names):
+    header_font = Font(bold=True)
+    cells = []
+    for name in names:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = header_font
+        cell.alignment = Alignment(vertical="center")
+        cells.append(cell)
+    return cells
 
-    return r
 
+def _hyperlink_cell(ws, value, link):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.hyperlink = link
+    cell.style = "Hyperlink"
+    return cell
 
 
-def append_rows_with_documents(rows: list, filename: str):
+def write_workbook_from_ledger(ledger_path: str, filename: str) -> int:
     """
-    rows: list of dict with OUTPUT_COLUMNS + internal field:
-      - __docs: list[(name,url)]
-    Writes:
+    Пересобирает xlsx целиком из журнала в write-only режиме (строки идут потоком):
       - sheet ALL: основные данные + гиперссылка на строку лота в Documents
       - sheet Documents: 1 строка на 1 лот, документы в ширину (B..)
+    Возвращает число строк на листе ALL.
     """
-    if not rows:
-        print("Нет новых данных для записи в Excel.")
-        return
-
-    wb, ws_main, ws_docs = ensure_workbook(filename)
-
-    # чтобы не добавлять повторные строки на Documents
-    existing_lot_keys_docs = read_existing_lot_keys(ws_docs)
-
-    # Map header -> column index in MAIN
-    main_headers = [ws_main.cell(row=1, column=c).value for c in range(1, ws_main.max_column + 1)]
-    header_to_col = {h: i + 1 for i, h in enumerate(main_headers)}
-
-    docs_col = header_to_col.get("Документы")
-    if not docs_col:
-        ws_main.cell(row=1, column=ws_main.max_column + 1).value = "Документы"
-        docs_col = ws_main.max_column
-        header_to_col["Документы"] = docs_col
-
-    added_rows = 0
-
-    for row in rows:
-        docs = row.pop("__docs", [])
-        out = {c: row.get(c, "") for c in OUTPUT_COLUMNS}
-
-        # 1) write MAIN row
-        main_row_index = ws_main.max_row + 1
-        for col_name in OUTPUT_COLUMNS:
-            col_idx = header_to_col.get(col_name)
-            if not col_idx:
-                col_idx = ws_main.max_column + 1
-                ws_main.cell(row=1, column=col_idx).value = col_name
-                header_to_col[col_name] = col_idx
-            ws_main.cell(row=main_row_index, column=col_idx).value = out.get(col_name, "")
-
-        # 2) write Documents row "wide" once per lot_key
-        lot_key = out.get("Номер аукциона / лота", "").strip()
-        docs_count = len([d for d in docs if d and d[1]])
-
-        c_docs = ws_main.cell(row=main_row_index, column=docs_col)
-
-        if not lot_key or docs_count == 0:
-            c_docs.value = "Документы (0)"
-        else:
-            # если уже есть строка на Documents — просто найдём её номер (скан, но быстро)
-            if lot_key in existing_lot_keys_docs:
-                # ищем строку
-                doc_row = 0
-                for r in range(2, ws_docs.max_row + 1):
-                    v = ws_docs.cell(row=r, column=1).value
-                    if v and str(v).strip() == lot_key:
-                        doc_row = r
-                        break
-            else:
-                doc_row = append_documents_row_wide(ws_docs, lot_key, docs)
-                existing_lot_keys_docs.add(lot_key)
-
-            c_docs.value = f"Документы ({docs_count})"
-            c_docs.hyperlink = f"#'{DOCS_SHEET_NAME}'!A{doc_row}"
-            c_docs.style = "Hyperlink"
-
-        added_rows += 1
-
-    # widths
-    set_column_widths(ws_main)
+    wb = Workbook(write_only=True)
+    ws_main = wb.create_sheet(MAIN_SHEET_NAME)
+    ws_docs = wb.create_sheet(DOCS_SHEET_NAME)
 
+    # в write-only режиме ширины и закрепление задаются до первой строки
+    set_column_widths(ws_main, OUTPUT_COLUMNS)
     ws_docs.column_dimensions["A"].width = 25
     # для документов B.. пусть будет нормальная ширина
-    for col_idx in range(2, min(ws_docs.max_column, 40) + 1):  # ограничим 40 колонок на всякий
+    for col_idx in range(2, 40 + 1):  # ограничим 40 колонок на всякий
         ws_docs.column_dimensions[get_column_letter(col_idx)].width = 45
+    ws_main.freeze_panes = "A2"
+    ws_docs.freeze_panes = "A2"
 
-    wb.save(filename)
-    print(f"Добавлено строк в {filename}: {added_rows}")
+    ws_main.append(_header_cells(ws_main, OUTPUT_COLUMNS))
+    ws_docs.append(_header_cells(ws_docs, ["Номер аукциона / лота", "Документы"]))
 
+    docs_col = OUTPUT_COLUMNS.index("Документы")
+    doc_rows = {}  # lot_key -> номер строки на Documents (одна строка на лот)
+    count = 0
 
+    for rec in read_ledger(ledger_path):
+        row = rec.get("row") or {}
+        docs = rec.get("docs") or []
+        values = [row.get(c, "") for c in OUTPUT_COLUMNS]
 
-# ----------------------------
-# Parser
-# ----------------------------
-class BankrotParser:
-    def __init__(self, base_url: str, headless: bool = False, page_load_timeout: int = 25, cookies_path: str = None):
-        self.base_url = base_url.rstrip("/")
-        self.cookies_path = cookies_path
+        lot_key = str(row.get("Номер аукциона / лота", "")).strip()
+        if not lot_key or not docs:
+            values[docs_col] = "Документы (0)"
+        else:
+            doc_row = doc_rows.get(lot_key)
+            if doc_row is None:
+                doc_row = len(doc_rows) + 2
+                doc_rows[lot_key] = doc_row
+                ws_docs.append([lot_key] + [_hyperlink_cell(ws_docs, name, url) for name, url in docs])
+            values[docs_col] = _hyperlink_cell(
+                ws_main, f"Документы ({len(docs)})", f"#'{DOCS_SHEET_NAME}'!A{doc_row}"
+            )
+
+        ws_main.append(values)
+        count += 1
+
+    tmp = filename + ".tmp"
+    try:
+        wb.save(tmp)
+        os.replace(tmp, filename)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
 
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument("--headless=new")
 
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--window-size=1400,900")
-        chrome_options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0 Safari/537.36"
-        )
+def append_rows_with_documents(rows: list, filename: str, ledger_path: str):
+    """
+    Дописывает rows в журнал и пересобирает из него filename.
+    (xlsx без журнала — из прошлых версий — сначала переносится в журнал)
+    Журнал — источник правды: если xlsx не пересобрался (например, открыт в Excel),
+    это не ошибка — он пересоберётся при следующем запуске.
+    """
+    seed_ledger_from_workbook(filename, ledger_path)
 
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
+    if rows:
+        added_rows = append_rows_to_ledger(rows, ledger_path)
+    elif _workbook_is_stale(filename, ledger_path):
+        added_rows = 0
+        print(f"{filename} отстаёт от журнала — пересобираем.")
+    else:
+        print("Нет новых данных для записи в Excel.")
+        return
 
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=chrome_options
-        )
-        self.driver.execute_cdp_cmd(
-            "Page.addScriptToEvaluateOnNewDocument",
-            {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"}
-        )
-        self.driver.set_page_load_timeout(page_load_timeout)
-        self.wait = WebDriverWait(self.driver, 12)
+    try:
+        total = write_workbook_from_ledger(ledger_path, filename)
+    except Exception as e:
+        print(f"⚠️ Не удалось сохранить {filename} (открыт в Excel?): {e}. "
+              f"Строки сохранены в {ledger_path}, Excel пересоберётся при следующем запуске.")
+        return
+    print(f"Добавлено строк в {filename}: {added_rows} (всего: {total})")
 
-        # Apply cookies
-        if self.cookies_path:
-            apply_cookies_to_driver(self.driver, self.base_url, self.cookies_path)
 
-    def close(self):
-        try:
-            self.driver.quit()
-        except Exception:
-            pass
+def _workbook_is_stale(filename: str, ledger_path: str) -> bool:
+    """Журнал менялся после последней удачной пересборки xlsx"""
+    if not os.path.exists(ledger_path):
+        return False
+    return not os.path.exists(filename) or os.path.getmtime(filename) < os.path.getmtime(ledger_path)
 
-    def _parse_info_wrapper(self, soup, title_text: str):
-        wrappers = soup.select("div.lot-info__wrapper")
-        target = title_text.strip().lower()
 
-        for w in wrappers:
-            h3 = w.select_one("h3.lot-info__title")
-            if not h3:
-                continue
-            if h3.get_text(" ", strip=True).strip().lower() != target:
+# ----------------------------
+# Lot page parser (HTML -> row, без браузера)
+# ----------------------------
+class LotPageParser:
+    def _index_info_wrappers(self, sections: dict):
+        """{заголовок блока (casefold): div.lot-info__wrapper}"""
+        blocks = {}
+        for w in _section_nodes(sections, "lot-info__wrapper", "div"):
+            h3 = _first(_XP_INFO_TITLE(w))
+            if h3 is None:
                 continue
+            blocks.setdefault(_text(h3).casefold(), w)
+        return blocks
 
-            out = {}
-            for item in w.select("div.lot-info__item"):
-                sub = item.select_one(".lot-info__subtitle")
-                val_el = item.select_one(".lot-info__value")
-                if not sub or not val_el:
-                    continue
-                key = sub.get_text(" ", strip=True).strip()
-                val = val_el.get_text(" ", strip=True).strip()
-                out[key] = val
+    def _parse_info_wrapper(self, info_blocks: dict, title_text: str):
+        w = info_blocks.get(title_text.casefold())
+        if w is None:
+            return {}
 
-            return out
+        out = {}
+        for item in _XP_INFO_ITEMS(w):
+            sub = _first(_XP_INFO_SUBTITLE(item))
+            val_el = _first(_XP_INFO_VALUE(item))
+            if sub is None or val_el is None:
+                continue
+            out[_text(sub)] = _text(val_el)
 
-        return {}
+        return out
 
-    def _extract_lot_and_trade_numbers(self, soup):
-        el = soup.select_one("span.lot__help")
-        if not el:
+    def _extract_lot_and_trade_numbers(self, sections: dict):
+        el = _first(_section_nodes(sections, "lot__help", "span"))
+        if el is None:
             return ("Не найдено", "Не найдено")
 
-        text = el.get_text(" ", strip=True)
+        text = _text(el)
         lot_num = "Не найдено"
         trade_num = "Не найдено"
 
-        m = re.search(r"Лот\s*№\s*(\d+)", text, flags=re.IGNORECASE)
+        m = _LOT_RE.search(text)
         if m:
             lot_num = m.group(1)
 
-        m = re.search(r"торги\s*№\s*(\d+)", text, flags=re.IGNORECASE)
+        m = _TRADE_RE.search(text)
         if m:
             trade_num = m.group(1)
 
         return (lot_num, trade_num)
 
-    def _extract_status(self, soup):
-        el = soup.select_one("span.lot__status")
-        return el.get_text(" ", strip=True) if el else "Не найдено"
+    def _extract_status(self, sections: dict):
+        el = _first(_section_nodes(sections, "lot__status", "span"))
+        return _text(el) if el is not None else "Не найдено"
 
-    def _extract_details_info(self, soup):
+    def _extract_details_info(self, sections: dict):
         out = {}
-        for item in soup.select("div.lot-details-info__item"):
-            sub = item.select_one(".lot-details-info__subtitle")
-            if not sub:
+        for item in _section_nodes(sections, "lot-details-info__item", "div"):
+            sub = _first(_XP_DETAILS_SUBTITLE(item))
+            if sub is None:
                 continue
-            key = sub.get_text(" ", strip=True).strip()
+            key = _text(sub)
 
-            val_el = item.select_one(".lot-details-info__value")
-            if not val_el:
-                val_el = item.find(["span", "div", "a"])
-            if not val_el:
+            val_el = _first(_XP_DETAILS_VALUE(item))
+            if val_el is None:
+                val_el = _first(_XP_DETAILS_ANY_VALUE(item))
+            if val_el is None:
                 continue
 
-            link_num = item.select_one("a[data-number]")
-            if link_num and key.strip().upper() in {"ИНН", "ОГРН"}:
-                out[key] = link_num.get("data-number") or link_num.get_text(" ", strip=True).strip()
+            link_num = _first(_XP_DATA_NUMBER_LINK(item))
+            if link_num is not None and key.upper() in {"ИНН", "ОГРН"}:
+                out[key] = link_num.get("data-number") or _text(link_num)
             else:
-                out[key] = val_el.get_text(" ", strip=True).strip()
+                out[key] = _text(val_el)
 
         return out
 
-    def _extract_debtor_inn_contact(self, soup):
-        d = self._extract_details_info(soup)
+    def _extract_debtor_inn_contact(self, d: dict):
         debtor = (
             d.get("Наименование / ФИО")
             or d.get("Полное наименование")
@@ -450,59 +600,42 @@ class BankrotParser:
             return "Не найдено"
         t = " ".join(text.split())
 
-        m = re.search(
-            r"(?i)(?:расположен\w*|наход\w*)\s+по\s+адрес[ау]?\s*:\s*(.+?)(?=(?:начальн\w*\s+цен|задаток|кадастров\w*\s+номер|$))",
-            t
-        )
-        if m:
-            return m.group(1).strip(" ,.;")
-
-        m = re.search(
-            r"(?i)по\s+адрес[ау]?\s*:\s*(.+?)(?=(?:начальн\w*\s+цен|задаток|кадастров\w*\s+номер|$))",
-            t
-        )
-        if m:
-            return m.group(1).strip(" ,.;")
-
-        m = re.search(
-            r"(?i)местонахождение\s*:\s*(.+?)(?=(?:начальн\w*\s+цен|задаток|$))",
-            t
-        )
-        if m:
-            return m.group(1).strip(" ,.;")
+        for pattern in _ADDR_RES:
+            m = pattern.search(t)
+            if m:
+                return m.group(1).strip(" ,.;")
 
         return "Не найдено"
 
     def _extract_address_from_desc_p(self, desc_p):
-        for a in desc_p.select("a"):
-            use = a.select_one("use")
-            href = use.get("xlink:href", "") if use else ""
-            if "icon-location" in href:
-                addr = a.get_text(" ", strip=True).strip()
-                return addr if addr else "Не найдено"
-        return self._extract_address_from_text(desc_p.get_text(" ", strip=True))
-
-    def _extract_description_and_address(self, soup):
-        content = soup.select_one("div.lot__content.text-break")
-        if not content:
+        a = _first(_XP_LOCATION_LINK(desc_p))
+        if a is not None:
+            return _text(a) or "Не найдено"
+        return self._extract_address_from_text(_text(desc_p))
+
+    def _extract_description_and_address(self, sections: dict):
+        content = _first(_section_nodes(sections, "lot__content", "div", also="text-break"))
+        if content is None:
             return ("Не найдено", "Не найдено")
 
-        desc_p = content.select_one('p[itemprop="description"]')
-        if desc_p:
-            desc_text = desc_p.get_text(" ", strip=True).strip()
+        desc_p = _first(_XP_DESCRIPTION_P(content))
+        if desc_p is not None:
+            desc_text = _text(desc_p)
             address = self._extract_address_from_desc_p(desc_p)
             return (desc_text if desc_text else "Не найдено", address)
 
-        ps = content.select("p")
-        full = "\n".join(p.get_text(" ", strip=True).strip() for p in ps if p.get_text(strip=True))
+        full = "\n".join(t for t in (_text(p) for p in content.iter("p")) if t)
         addr = self._extract_address_from_text(full)
-        return (full if full.strip() else "Не найдено", addr)
+        return (full or "Не найдено", addr)
 
-    def _extract_documents(self, soup):
+    def _extract_documents(self, sections: dict):
+        wrappers = sections.get("lot-documents__wrapper", [])
         docs = []
-        for a in soup.select(".lot-documents__wrapper a.lot-documents__link"):
+        for a in _section_nodes(sections, "lot-documents__link", "a"):
+            if not any(anc in wrappers for anc in a.iterancestors()):
+                continue
             href = (a.get("href") or "").strip()
-            name = a.get_text(" ", strip=True).strip()
+            name = _text(a)
             if href and name:
                 docs.append((name, href))
 
@@ -514,65 +647,17 @@ class BankrotParser:
                 uniq.append((name, href))
         return uniq
 
-    def get_listing_urls(self, category_url: str, max_lots: int = 300):
-        lot_links = set()
-        current_page = 1
-
-        while len(lot_links) < max_lots:
-            print(f"Листинг: страница {current_page}")
-            separator = "&" if "?" in category_url else "?"
-            url = f"{category_url}{separator}page={current_page}"
-
-            try:
-                self.driver.get(url)
-            except Exception:
-                pass
-
-            try:
-                self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a[href*='/lot/']")))
-                time.sleep(2.0)
-            except TimeoutException:
-                print("Лоты не появились (возможно страницы закончились или контент не прогрузился).")
-                break
-
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-            links = soup.select("a[href*='/lot/']")
-            if not links:
-                print("Ссылки на лоты не найдены (конец списка).")
-                break
-
-            before = len(lot_links)
-            for a in links:
-                if len(lot_links) >= max_lots:
-                    break
-                href = (a.get("href") or "").strip()
-                if not href or href.startswith("#"):
-                    continue
-                full_link = href if href.startswith("http") else self.base_url + href
-                lot_links.add(full_link.split("#")[0])
-
-            print(f"  найдено ссылок: {len(links)}, уникальных всего: {len(lot_links)}")
-
-            if len(lot_links) == before:
-                print("Новых лотов не добавилось — остановка.")
-                break
-
-            time.sleep(random.uniform(1.6, 2.8))
-            current_page += 1
-
-        return list(lot_links)
-
-    def parse_lot_page(self, url: str):
+    def parse_lot_html(self, url: str, html: str):
         try:
-            self.driver.get(url)
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            time.sleep(random.uniform(1.1, 1.9))
+            tree = lxml_html.fromstring(html, parser=_html_parser())
+            sections = _index_lot_sections(tree)
 
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
+            info_blocks = self._index_info_wrappers(sections)
+            details = self._extract_details_info(sections)
 
-            lot_number, trade_number = self._extract_lot_and_trade_numbers(soup)
-            prices = self._parse_info_wrapper(soup, "Цены")
-            dates = self._parse_info_wrapper(soup, "Даты торгов")
+            lot_number, trade_number = self._extract_lot_and_trade_numbers(sections)
+            prices = self._parse_info_wrapper(info_blocks, "Цены")
+            dates = self._parse_info_wrapper(info_blocks, "Даты торгов")
 
             start_price = prices.get("Начальная", "Не найдено")
             step = prices.get("Шаг повышения", "Не найдено")
@@ -582,16 +667,16 @@ class BankrotParser:
             accept_to = dates.get("Приём заявок до", "Не найдено")
             trade_period = f"{accept_from} — {accept_to}"
 
-            status = self._extract_status(soup)
-            description, address = self._extract_description_and_address(soup)
+            status = self._extract_status(sections)
+            description, address = self._extract_description_and_address(sections)
 
-            debtor, inn_debtor, contact_person = self._extract_debtor_inn_contact(soup)
+            debtor, inn_debtor, contact_person = self._extract_debtor_inn_contact(details)
             debtor_info = f"{debtor}; ИНН: {inn_debtor}"
             if contact_person and contact_person != "Не найдено":
                 debtor_info += f"; Контакт: {contact_person}"
 
             auction_lot = f"{trade_number} / {lot_number}"
-            docs = self._extract_documents(soup)
+            docs = self._extract_documents(sections)
 
             row = {
                 "Номер аукциона / лота": auction_lot,
@@ -618,31 +703,393 @@ class BankrotParser:
             return (url, None)
 
 
+_LOT_PAGE_PARSER = LotPageParser()
+
+
+def is_lot_page_rendered(html: str) -> bool:
+    """Есть ли в HTML разметка карточки (без разбора — поиском подстроки)"""
+    return bool(html) and any(m in html for m in LOT_PAGE_MARKERS)
+
+
+def parse_lot_html(url: str, html: str):
+    """Функция уровня модуля, чтобы её можно было отдать в ProcessPoolExecutor"""
+    return _LOT_PAGE_PARSER.parse_lot_html(url, html)
+
+
 # ----------------------------
-# Parallel helpers
+# Browser (Selenium): листинг и карточки, если сайт отдаёт их только через JS
 # ----------------------------
-def worker_parse(base_url: str, urls, headless: bool, cookies_path: str):
-    parser = BankrotParser(base_url, headless=headless, cookies_path=cookies_path)
-    out_rows = []
-    out_urls = []
-    try:
-        for url in urls:
-            u, row = parser.parse_lot_page(url)
-            if row:
-                out_rows.append(row)
-                out_urls.append(u)
-            time.sleep(random.uniform(0.8, 1.6))
-        return out_rows, out_urls
-    finally:
-        parser.close()
+@functools.lru_cache(maxsize=None)
+def chromedriver_path() -> str:
+    """
+    ChromeDriverManager().install() ходит в сеть и на диск — делаем это один раз на процесс.
+    (лениво, а не при импорте: процессы-парсеры ProcessPoolExecutor импортируют этот модуль)
+    """
+    return ChromeDriverManager().install()
+
+
+class BankrotParser:
+    def __init__(self, base_url: str, headless: bool = False, page_load_timeout: int = 25, cookies_path: str = None,
+                 driver_path: str = None):
+        self.base_url = base_url.rstrip("/")
+        self.cookies_path = cookies_path
+
+        chrome_options = Options()
+        if headless:
+            chrome_options.add_argument("--headless=new")
+            chrome_options.add_argument("--disable-gpu")
+        # от root Chrome без --no-sandbox не стартует; обычному пользователю песочницу не отключаем
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            chrome_options.add_argument("--no-sandbox")
+
+        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+        chrome_options.add_argument("--window-size=1400,900")
+        chrome_options.add_argument(f"user-agent={USER_AGENT}")
+        # без /dev/shm (в docker его 64MB — вкладки падают)
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option("useAutomationExtension", False)
+
+        # парсеру нужен только DOM: картинки/стили/шрифты не грузим,
+        # driver.get возвращается на DOMContentLoaded, а не после полной загрузки
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.stylesheets": 2,
+            "profile.managed_default_content_settings.fonts": 2,
+        })
+        chrome_options.page_load_strategy = "eager"
+
+        self.driver = webdriver.Chrome(
+            # лог chromedriver в консоль не нужен
+            service=Service(driver_path or chromedriver_path(), log_output=subprocess.DEVNULL),
+            options=chrome_options
+        )
+        self.driver.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument",
+            {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"}
+        )
+        # ассеты режем ещё до запроса (prefs выше не покрывают видео, svg и т.п.)
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BROWSER_BLOCKED_URLS})
+        self.driver.set_page_load_timeout(page_load_timeout)
+        self.wait = WebDriverWait(self.driver, 12)
+
+        # Apply cookies
+        self.logged_in = False
+        if self.cookies_path:
+            self.logged_in = apply_cookies_to_driver(self.driver, self.base_url, self.cookies_path)
+
+    def close(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+    def render_listing_page(self, url: str):
+        """HTML страницы листинга после рендера в Chrome; None — ссылки на лоты так и не появились"""
+        try:
+            self.driver.get(url)
+        except Exception:
+            pass
+
+        try:
+            self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a[href*='/lot/']")))
+        except TimeoutException:
+            print("Лоты не появились (возможно страницы закончились или контент не прогрузился).")
+            return None
+
+        return self.driver.page_source
+
+    def render_lot_page(self, url: str):
+        """HTML карточки после рендера в Chrome; None — разметка лота так и не появилась"""
+        try:
+            self.driver.get(url)
+        except Exception:
+            pass
+
+        try:
+            self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, LOT_PAGE_SELECTOR)))
+        except TimeoutException:
+            print(f"Карточка не прогрузилась в Chrome: {url}")
+            return None
+
+        return self.driver.page_source
+
+
+# ----------------------------
+# Async HTTP fetching (lot pages)
+# ----------------------------
+def build_cookie_jar(base_url: str, cookies_path: str) -> aiohttp.CookieJar:
+    """Куки из auth_cookies.json -> aiohttp.CookieJar (вызывать внутри event loop)"""
+    jar = aiohttp.CookieJar()
+    cookies = {}
+    for c in load_auth_cookies(cookies_path):
+        if isinstance(c, dict) and c.get("name") and c.get("value") is not None:
+            cookies[c["name"]] = c["value"]
+    if cookies:
+        jar.update_cookies(cookies, response_url=URL(base_url.rstrip("/") + "/"))
+    return jar
+
+
+def open_http_session(base_url: str, cookies_path: str, concurrency: int = 32, timeout: int = 25):
+    """Одна сессия на запуск (keep-alive): и листинг, и карточки"""
+    return aiohttp.ClientSession(
+        cookie_jar=build_cookie_jar(base_url, cookies_path),
+        connector=aiohttp.TCPConnector(limit=concurrency),
+        headers={"User-Agent": USER_AGENT},
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+async def fetch_html(session: aiohttp.ClientSession, url: str, retries: int = 3,
+                     max_delay: float = 30) -> str:
+    """GET с повтором на 429/5xx; пауза — по Retry-After (не больше max_delay), иначе 1, 2, 4... с"""
+    for attempt in range(retries + 1):
+        async with session.get(url) as resp:
+            if not ((resp.status == 429 or resp.status >= 500) and attempt < retries):
+                resp.raise_for_status()
+                return await resp.text()
+            try:
+                delay = float(resp.headers.get("Retry-After", ""))
+            except ValueError:
+                delay = 2 ** attempt
+        # ждём уже вне async with: соединение вернулось в пул и не занято на время паузы
+        await asyncio.sleep(min(max(delay, 0), max_delay))
+
+
+def listing_page_url(category_url: str, page: int) -> str:
+    separator = "&" if "?" in category_url else "?"
+    return f"{category_url}{separator}page={page}"
+
+
+def extract_lot_links(html: str, base_url: str) -> list:
+    """Уникальные абсолютные ссылки на лоты со страницы листинга (в порядке появления)"""
+    # LISTING_STRAINER уже оставил только a[href*=/lot/] — CSS-селектор не нужен
+    soup = BeautifulSoup(html or "", "lxml", parse_only=LISTING_STRAINER)
+    hrefs = [
+        urldefrag(urljoin(base_url, h)).url
+        for a in soup.find_all("a")
+        if (h := (a.get("href") or "").strip()) and not h.startswith("#")
+    ]
+    return list(dict.fromkeys(hrefs))
+
+
+async def parse_lots(session: aiohttp.ClientSession, url_queue: asyncio.Queue, concurrency: int = 32,
+                     parse_workers: int = None):
+    """
+    concurrency воркеров берут URL из url_queue (None — конец, по одному на воркер),
+    качают карточку и отдают HTML на разбор (CPU) в ProcessPoolExecutor.
+    Возвращает (results, js_urls): [(url, row|None), ...] в порядке завершения и
+    карточки без разметки лота в HTML (рендерит JS) — их разбирает render_lots_in_browser.
+    """
+    loop = asyncio.get_running_loop()
+    results = []
+    js_urls = []
+
+    async def worker(pool):
+        # каждый воркер держит не больше одной страницы: в памяти <= concurrency HTML
+        while True:
+            url = await url_queue.get()
+            if url is None:
+                return
+            try:
+                html = await fetch_html(session, url)
+            except Exception as e:
+                print(f"Ошибка загрузки: {url} -> {e}")
+                results.append((url, None))
+                continue
+            if not is_lot_page_rendered(html):
+                js_urls.append(url)
+                continue
+            try:
+                results.append(await loop.run_in_executor(pool, parse_lot_html, url, html))
+            except Exception as e:
+                # например BrokenProcessPool (процесс-парсер убит по OOM) — остальные результаты не теряем
+                print(f"Ошибка разбора: {url} -> {e!r}")
+                results.append((url, None))
+
+    # spawn, а не fork: к этому моменту в процессе уже есть потоки (резолвер aiohttp, to_thread для Chrome),
+    # fork такого процесса может повесить дочерний; модуль при импорте ничего не делает — spawn безопасен
+    with ProcessPoolExecutor(max_workers=parse_workers or os.cpu_count(),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        await asyncio.gather(*(worker(pool) for _ in range(concurrency)))
+
+    return results, js_urls
+
+
+async def render_lots_in_browser(browser, urls: list):
+    """Карточки, которые по HTTP пришли без разметки: по одной через Chrome -> [(url, row|None), ...]"""
+    print(f"Карточек без HTML-разметки (JS): {len(urls)} — открываем в Chrome")
+    results = []
+    for i, url in enumerate(urls):
+        try:
+            html = await asyncio.to_thread(browser.render_lot_page, url)
+        except Exception as e:
+            # Chrome упал / сессия потеряна: остальные карточки в нём ждать бессмысленно
+            print(f"Chrome сломался на {url} -> {e}; оставшиеся карточки без разметки пропускаем.")
+            results += [(u, None) for u in urls[i:]]
+            break
+        results.append(parse_lot_html(url, html) if html else (url, None))
+    return results
+
 
+# ----------------------------
+# Pipeline: листинг -> загрузка и разбор карточек (одновременно)
+# ----------------------------
+async def iter_listing_urls(fetch_page, category_url: str, base_url: str, max_lots: int = 300, page_delay=None,
+                            seen=(), seen_streak: int = 20):
+    """
+    Async-генератор: отдаёт (url, is_new) сразу после разбора каждой страницы листинга.
+    fetch_page: async (url) -> html | None; page_delay: (min, max) паузы между страницами или None.
+    max_lots — лимит новых (url not in seen) лотов; после seen_streak уже известных подряд
+    листинг дальше не идёт (sort=created_desc: ниже только старые). seen_streak=None — не останавливаться.
+    """
+    lot_links = set()
+    new_count = 0
+    streak = 0
+    current_page = 1
+
+    while new_count < max_lots:
+        print(f"Листинг: страница {current_page}")
+        html = await fetch_page(listing_page_url(category_url, current_page))
+        if html is None:
+            break
+
+        links = extract_lot_links(html, base_url)
+        if not links:
+            print("Ссылки на лоты не найдены (конец списка).")
+            break
+
+        fresh = [u for u in links if u not in lot_links]
+        lot_links.update(fresh)
+
+        print(f"  найдено ссылок: {len(links)}, уникальных всего: {len(lot_links)}")
+
+        if not fresh:
+            print("Новых лотов не добавилось — остановка.")
+            break
+
+        for u in fresh:
+            if u in seen:
+                streak += 1
+                yield u, False
+                if seen_streak and streak >= seen_streak:
+                    print(f"{streak} уже известных лотов подряд — дальше листинг не смотрим.")
+                    return
+            else:
+                streak = 0
+                new_count += 1
+                yield u, True
+                if new_count >= max_lots:
+                    return
 
-def chunk_list(items, n_chunks):
-    n_chunks = max(1, int(n_chunks))
-    chunks = [[] for _ in range(n_chunks)]
-    for idx, item in enumerate(items):
-        chunks[idx % n_chunks].append(item)
-    return chunks
+        if page_delay:
+            await asyncio.sleep(random.uniform(*page_delay))
+        current_page += 1
+
+
+async def scrape_new_lots(base_url: str, category_url: str, max_lots: int, seen, cookies_path: str,
+                          concurrency: int = 32, parse_workers: int = None, open_browser=None,
+                          browser_page_delay=(1.6, 2.8), seen_streak: int = 20):
+    """
+    Листинг сначала качается обычным HTTP; если в HTML нет ссылок на лоты (рендерит JS) —
+    через Chrome: open_browser() -> BankrotParser (между страницами пауза browser_page_delay,
+    (min, max) секунд; None — без пауз). Непарсенные ссылки (url not in seen, не больше max_lots)
+    сразу уходят в очередь на загрузку карточек, не дожидаясь конца листинга.
+    Карточки без разметки лота в HTML добираются через Chrome после HTTP-фазы
+    (браузер листинга, если он уже открыт, иначе open_browser()).
+    Возвращает (rows, parsed_urls, total_links, new_links) — rows в порядке листинга;
+    None — куки не авторизуют.
+    """
+    base_url = base_url.rstrip("/")
+    url_queue = asyncio.Queue()  # без лимита: в очереди только URL
+    new_links = []
+    total = 0
+    browser = None
+
+    async with open_http_session(base_url, cookies_path, concurrency) as session:
+        first_url = listing_page_url(category_url, 1)
+        try:
+            first_html = await fetch_html(session, first_url)
+        except Exception as e:
+            print(f"Листинг по HTTP не загрузился: {e}")
+            first_html = ""
+
+        if extract_lot_links(first_html, base_url):
+            # те же куки уходят на карточки: без авторизации качать их нет смысла
+            if not is_logged_in(first_html):
+                print("⚠️ По HTTP сайт не видит авторизацию. Обнови auth_cookies.json (bankrotbaza_session + XSRF-TOKEN).")
+                return None
+            print("Листинг: серверный HTML, Chrome не нужен")
+            prefetched = {first_url: first_html}
+
+            async def fetch_page(url):
+                if url in prefetched:
+                    return prefetched.pop(url)
+                try:
+                    return await fetch_html(session, url)
+                except Exception as e:
+                    print(f"Листинг: {url} -> {e}")
+                    return None
+
+            page_delay = None  # пауза только по 429 (см. fetch_html)
+        else:
+            if open_browser is None:
+                print("Листинг без JS не отдаётся, а браузер не задан.")
+                return None
+            print("Листинг рендерится JS — запускаем Chrome")
+            browser = await asyncio.to_thread(open_browser)
+            if not browser.logged_in:
+                await asyncio.to_thread(browser.close)
+                return None
+
+            def fetch_page(url):
+                return asyncio.to_thread(browser.render_listing_page, url)
+
+            page_delay = browser_page_delay
+
+        async def produce():
+            nonlocal total
+            try:
+                async for url, is_new in iter_listing_urls(fetch_page, category_url, base_url, max_lots,
+                                                           page_delay, seen, seen_streak):
+                    total += 1
+                    if not is_new:
+                        continue
+                    new_links.append(url)
+                    url_queue.put_nowait(url)
+            finally:
+                for _ in range(concurrency):
+                    url_queue.put_nowait(None)
+
+        try:
+            (results, js_urls), _ = await asyncio.gather(
+                parse_lots(session, url_queue, concurrency=concurrency, parse_workers=parse_workers),
+                produce(),
+            )
+            if js_urls:
+                if browser is None and open_browser is not None:
+                    # Chrome может не подняться (нет бинарника, офлайн) — карточки по HTTP терять нельзя
+                    try:
+                        browser = await asyncio.to_thread(open_browser)
+                    except Exception as e:
+                        print(f"Chrome не запустился: {e}")
+                if browser is not None and browser.logged_in:
+                    results += await render_lots_in_browser(browser, js_urls)
+                else:
+                    print(f"Карточек без HTML-разметки: {len(js_urls)} — Chrome недоступен, пропускаем.")
+                    results += [(u, None) for u in js_urls]
+        finally:
+            if browser is not None:
+                await asyncio.to_thread(browser.close)
+
+    order = {u: i for i, u in enumerate(new_links)}
+    results.sort(key=lambda r: order[r[0]])
+    rows = [row for _, row in results if row]
+    parsed_urls = [u for u, row in results if row]
+    return rows, parsed_urls, total, len(new_links)
 
 
 # ----------------------------
@@ -653,62 +1100,53 @@ if __name__ == "__main__":
     APARTMENTS_URL = "https://bankrotbaza.ru/search?comb=all&category%5B%5D=27&type_auction=on&sort=created_desc"
 
     MAX_LOTS = 500
-    WORKERS = 3
+    CONCURRENCY = 32
     HEADLESS = False
+    # пауза между страницами листинга, если он идёт через Chrome (по HTTP пауз нет, кроме 429)
+    BROWSER_PAGE_DELAY = (1.6, 2.8)
+    # столько уже распарсенных лотов подряд в листинге — дальше только старые, листать не нужно
+    SEEN_STREAK = 20
 
-    SEEN_FILE = "seen_lots.json"
+    SEEN_FILE = "seen_lots.log"
+    LEGACY_SEEN_FILE = "seen_lots.json"
     OUT_XLSX = "bankrot_apartments.xlsx"
+    ROWS_LEDGER = "bankrot_apartments.jsonl"
     COOKIES_FILE = "auth_cookies.json"
+    # путь к chromedriver (для запуска без сети); None — найти/скачать через webdriver_manager
+    CHROMEDRIVER = None
 
     print("Cookies path:", os.path.abspath(COOKIES_FILE), "exists:", os.path.exists(COOKIES_FILE))
     if not os.path.exists(COOKIES_FILE):
         print("❌ Не найден auth_cookies.json. Создай файл рядом со скриптом.")
         raise SystemExit(1)
 
-    # 1) listing
-    listing_parser = BankrotParser(BASE_URL, headless=HEADLESS, cookies_path=COOKIES_FILE)
-    try:
-        print("Сбор ссылок (квартиры)...")
-        all_links = listing_parser.get_listing_urls(APARTMENTS_URL, max_lots=MAX_LOTS)
-    finally:
-        listing_parser.close()
-
-    print(f"Собрано ссылок: {len(all_links)}")
-
-    # 2) filter seen
-    store = SeenLotsStore(SEEN_FILE)
-    seen = store.load()
-
-    new_links = [u for u in all_links if u not in seen]
-    print(f"Новых (непарсенных) лотов: {len(new_links)} / уже было: {len(all_links) - len(new_links)}")
-
-    if not new_links:
-        print("Ничего нового — выходим.")
-        raise SystemExit(0)
-
-    # 3) parallel parse
-    chunks = chunk_list(new_links, WORKERS)
-    results_rows = []
-    parsed_urls = []
-
-    print(f"Запуск параллельно: {WORKERS} браузера(ов)")
-    with ThreadPoolExecutor(max_workers=WORKERS) as ex:
-        futures = []
-        for ch in chunks:
-            if ch:
-                futures.append(ex.submit(worker_parse, BASE_URL, ch, HEADLESS, COOKIES_FILE))
-
-        for f in as_completed(futures):
-            part_rows, part_urls = f.result()
-            results_rows.extend(part_rows)
-            parsed_urls.extend(part_urls)
+    store = SeenLotsStore(SEEN_FILE, legacy_json_path=LEGACY_SEEN_FILE)
+    store.load()
+
+    def open_browser():
+        # CHROMEDRIVER=None -> BankrotParser сам возьмёт chromedriver_path()
+        return BankrotParser(BASE_URL, headless=HEADLESS, cookies_path=COOKIES_FILE, driver_path=CHROMEDRIVER)
+
+    # 1) listing + 2) fetch/parse — параллельно: карточки качаются по мере сбора ссылок
+    print(f"Сбор ссылок (квартиры) + загрузка карточек: до {CONCURRENCY} запросов одновременно, "
+          f"разбор на {os.cpu_count()} процессах")
+    result = asyncio.run(scrape_new_lots(
+        BASE_URL, APARTMENTS_URL, MAX_LOTS, store, COOKIES_FILE,
+        concurrency=CONCURRENCY, open_browser=open_browser, browser_page_delay=BROWSER_PAGE_DELAY,
+        seen_streak=SEEN_STREAK,
+    ))
+    if result is None:
+        print("❌ Авторизация по auth_cookies.json не прошла — выходим, карточки не качаем.")
+        raise SystemExit(1)
+    results_rows, parsed_urls, total_links, new_count = result
 
+    print(f"Собрано ссылок: {total_links}")
+    print(f"Новых (непарсенных) лотов: {new_count} / уже было: {total_links - new_count}")
     print(f"Успешно распарсено: {len(results_rows)}")
 
-    # 4) write excel
-    append_rows_with_documents(results_rows, OUT_XLSX)
+    # 3) write excel
+    append_rows_with_documents(results_rows, OUT_XLSX, ROWS_LEDGER)
 
-    # 5) save seen
-    store.add_many(parsed_urls)
-    store.save()
-    print(f"Память сохранена: {SEEN_FILE} (всего: {len(store.seen)})")
+    # 4) save seen
+    added = store.add_and_flush(parsed_urls)
+    print(f"Память сохранена: {SEEN_FILE} (+{added}, всего: {len(store.seen)})")